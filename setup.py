@@ -49,7 +49,8 @@ setup(
     packages=['terna'],
 
     # List run-time dependencies here.  These will be installed by pip when your project is installed.
-    install_requires=['requests', 'pandas'],
+    install_requires=['requests', 'pandas', 'orjson'],
+    extras_require={'async': ['aiohttp'], 'stream': ['ijson>=3.1'], 'arrow': ['pyarrow']},
 
     include_package_data=True,
 )
\ No newline at end of file
@@ -5,14 +5,33 @@
 # Created Date: Sunday 15 January 2023 at 19:31
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import orjson
 import pandas as pd
-import datetime
 import time
 import logging
 import sys
-from typing import Optional, Dict
+import asyncio
+import threading
+from typing import Optional, Dict, List, Tuple
 from urllib.parse import urlencode
 
+try:
+    import aiohttp
+except ImportError:  # optional, only needed by AsyncTernaPandasClient
+    aiohttp = None
+
+try:
+    import ijson
+except ImportError:  # optional, large responses are then decoded with orjson
+    ijson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional, large payloads are then built with pd.DataFrame
+    pa = None
+
 __title__ = "terna-py"
 __version__ = "0.5.5"
 __author__ = "fgenoese"
@@ -21,6 +40,177 @@ __license__ = "MIT"
 URL = 'https://api.terna.it/transparency/oauth/accessToken'
 BASE_URL = 'https://api.terna.it/'
 RATE_LIMIT = 1.1  # seconds between requests to respect the rate limit
+STREAM_THRESHOLD = 1 << 20  # bytes above which responses are parsed incrementally
+ARROW_THRESHOLD = 1000  # records above which DataFrames are built through pyarrow
+
+def _setup_logger(name: str, log_level: int) -> logging.Logger:
+    """
+    Logger writing to stdout at `log_level`, not propagated to the root logger.
+    """
+    log = logging.getLogger(name)
+    log.setLevel(log_level)
+    log.propagate = False  # prevent double logging
+    if not log.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        handler.setFormatter(formatter)
+        log.addHandler(handler)
+    for handler in log.handlers:
+        handler.setLevel(log_level)
+    return log
+
+def _is_flat(records) -> bool:
+    """
+    True if `records` is a list of dicts without nested dict values,
+    i.e. pd.DataFrame builds the same frame as pd.json_normalize.
+    """
+    return isinstance(records, list) and all(
+        isinstance(r, dict) and not any(isinstance(v, dict) for v in r.values())
+        for r in records)
+
+def _arrow_compatible(records) -> bool:
+    """
+    True if all records share the keys of the first one and hold no lists.
+    pa.Table.from_pylist infers its columns from the first record and would
+    drop any other key, and turns lists into numpy arrays.
+    """
+    keys = records[0].keys()
+    return all(r.keys() == keys and not any(isinstance(v, list) for v in r.values())
+               for r in records)
+
+def _adjust_tz(dt: pd.Series, tz: str) -> pd.Series:
+    """
+    Localize naive timestamps to `tz`. Timestamps off the 15-minute grid mark
+    the second (standard time) occurrence of the repeated DST hour and are
+    shifted back onto the grid before localizing.
+    """
+    delta = dt.dt.minute % 15
+    aligned = delta == 0
+    shift = (delta + 15 * (4 - delta)).where(~aligned, 0)
+    shifted = dt - pd.to_timedelta(shift, unit='m')
+    return shifted.dt.tz_localize(tz, ambiguous=aligned.to_numpy())
+
+def _json_to_df(payload: Dict) -> Optional[pd.DataFrame]:
+    """
+    Convert a decoded API response into a DataFrame.
+
+    Parameters
+    ----------
+    payload : dict
+
+    Returns
+    -------
+    pd.DataFrame
+        None if the payload carries no result
+    """
+    key = next((k for k in payload if k != 'result'), None)
+    if 'result' not in payload or key is None:
+        return None
+    records = payload[key]
+    # Terna records are almost always flat: skip json_normalize unless needed
+    if not _is_flat(records):
+        df = pd.json_normalize(records)
+    elif pa is not None and len(records) > ARROW_THRESHOLD and _arrow_compatible(records):
+        # columnar build in C++; keep numpy dtypes so the numeric conversion below still applies
+        try:
+            df = pa.Table.from_pylist(records).to_pandas()
+        except (pa.ArrowException, OverflowError):
+            df = pd.DataFrame(records)
+    else:
+        df = pd.DataFrame(records)
+    # Normalize column name to 'Date' if 'date' exists
+    if 'Date' in df.columns and 'date' not in df.columns:
+        df.rename(columns={'Date': 'date'}, inplace=True)
+    if 'date' in df.columns or 'Date' in df.columns:
+        '''
+        # df['date'] = pd.to_datetime(df['Date'])
+        # df['date'] = _adjust_tz(df['date'], tz="Europe/Rome")
+        
+        df['date'] = pd.to_datetime(df['date']).dt.tz_localize('Europe/Rome', ambiguous='NaT')
+        '''                        
+        # df = df.set_index('date').rename_axis(None)
+        # if not df.index.is_monotonic_increasing:  # the API already returns time-ordered data
+        #     df = df.sort_index()
+        pass
+    elif 'Year' in df.columns:
+        # df = df.set_index('Year').rename_axis(None)
+        pass
+    # skip columns that are already numeric; write the converted ones back in a single pass
+    converted = {}
+    for col, dtype in df.dtypes.items():
+        if col != 'date' and not pd.api.types.is_numeric_dtype(dtype):  # <-- evita di convertire la colonna Date in numeric
+            try:
+                converted[col] = pd.to_numeric(df[col])
+            except (ValueError, TypeError):
+                pass
+    if converted:
+        df = df.assign(**converted)
+    return df
+
+def _request_data(start=None, end=None, extra_params: Optional[dict] = None) -> Dict:
+    """
+    Build the query parameters shared by every endpoint.
+    """
+    if start is None or end is None:
+        return dict(extra_params) if extra_params else {}
+
+    # works for pd.Timestamp, datetime.datetime and datetime.date alike
+    data = {
+        'dateFrom': f"{start.day:02d}/{start.month:02d}/{start.year:04d}",
+        'dateTo': f"{end.day:02d}/{end.month:02d}/{end.year:04d}",
+    }
+    if extra_params:
+        data.update(extra_params)
+    return data
+
+class _RateLimiter:
+    """
+    Thread-safe token bucket allowing one request every RATE_LIMIT seconds.
+    Idle time refills the bucket, so a request after a pause goes out at once.
+    """
+    RATE = 1 / RATE_LIMIT
+    MAX_TOKENS = 1
+
+    def __init__(self):
+        self.tokens = self.MAX_TOKENS
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        # consume a token if available, otherwise return the seconds to wait for one
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.tokens + (now - self.updated_at) * self.RATE, self.MAX_TOKENS)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.RATE
+
+    def acquire(self) -> float:
+        """
+        Block until a request may be sent.
+
+        Returns
+        -------
+        waited : float
+            Seconds spent waiting.
+        """
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if not wait:
+                return waited
+            time.sleep(wait)
+            waited += wait
+
+class _RateLimitedRetry(Retry):
+    """
+    urllib3 retries run below _RateLimiter and send the first retry at once;
+    never back off for less than RATE_LIMIT.
+    """
+    def get_backoff_time(self) -> float:
+        return max(RATE_LIMIT, super().get_backoff_time())
 
 class TernaPandasClient:
     def __init__(
@@ -40,17 +230,7 @@ class TernaPandasClient:
             Logging level (default: logging.ERROR)
         """
         
-        # Set up logger
-        log = logging.getLogger(__name__)
-        log.setLevel(log_level)
-        log.propagate = False  # prevent double logging
-        if not log.handlers:
-            handler = logging.StreamHandler(sys.stdout)
-            handler.setLevel(log_level)
-            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-            handler.setFormatter(formatter)
-            log.addHandler(handler)
-        self.logger = log
+        self.logger = _setup_logger(__name__, log_level)
         self.logger.debug("Client initialized with log level %s", logging.getLevelName(log_level))
         
         if api_key is None:
@@ -61,12 +241,18 @@ class TernaPandasClient:
         self.api_secret = api_secret
         if session is None:
             session = requests.Session()
+            # keep TLS connections alive across calls and let urllib3 retry transient server errors;
+            # 429 is left to the caller, urllib3 retries would bypass the rate limiter
+            retries = _RateLimitedRetry(total=3, backoff_factor=RATE_LIMIT, status_forcelist=(500, 502, 503, 504),
+                                        raise_on_status=False)
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retries)
+            session.mount('https://', adapter)
         self.session = session
         self.proxies = proxies
         self.timeout = timeout
         self.token = None
-        self.token_expiration = datetime.datetime.now()
-        self.time_of_last_request = time.monotonic() - 1
+        self.token_expires_monotonic = time.monotonic()
+        self._limiter = _RateLimiter()
 
     def _request_token(self, data: Dict = {}) -> Optional[str]:
 
@@ -80,8 +266,8 @@ class TernaPandasClient:
         access_token : str
         """
         # keep current token if still valid
-        if self.token_expiration - datetime.timedelta(seconds =5) > datetime.datetime.now() and self.token: # Still valid token
-            print ("Using existing token:", self.token)
+        if self.token and time.monotonic() < self.token_expires_monotonic - 5: # Still valid token
+            self.logger.debug("Using existing token")
             return self.token
 
 
@@ -96,14 +282,11 @@ class TernaPandasClient:
         data.update(base_data)
 
         try:
-            time_elapsed = time.monotonic() - self.time_of_last_request
-            if time_elapsed < RATE_LIMIT:
-                self.logger.debug("[token] Waiting for %.2f seconds to respect rate limit", RATE_LIMIT - time_elapsed)
-                time.sleep(RATE_LIMIT - time_elapsed)
+            waited = self._limiter.acquire()
+            if waited:
+                self.logger.debug("[token] Waited for %.2f seconds to respect rate limit", waited)
             response = self.session.post(URL, headers=headers, data=data)
-            self.time_of_last_request = time.monotonic()
             response.raise_for_status()
-            self.logger.debug(f"Response content: {response.text}")
 
         except requests.HTTPError as exc:
             code = exc.response.status_code
@@ -113,9 +296,10 @@ class TernaPandasClient:
         
         else:
             if response.status_code == 200:
-                token = response.json().get('access_token')
-                expires_in = response.json().get('expires_in')
-                self.token_expiration = datetime.datetime.now() + datetime.timedelta(seconds=expires_in)
+                payload = orjson.loads(response.content)
+                token = payload.get('access_token')
+                expires_in = payload.get('expires_in')
+                self.token_expires_monotonic = time.monotonic() + expires_in
                 self.token = token
                 return token
             else:
@@ -144,60 +328,53 @@ class TernaPandasClient:
         self.logger.debug(f"Request data: {data}")
         
         try:
-            time_elapsed = time.monotonic() - self.time_of_last_request
-            if time_elapsed < RATE_LIMIT:
-                self.logger.debug("[base request] Waiting for %.2f seconds to respect rate limit", RATE_LIMIT - time_elapsed)
-                time.sleep(RATE_LIMIT - time_elapsed)
-            response = self.session.get(_url, headers=headers, params=data)
+            waited = self._limiter.acquire()
+            if waited:
+                self.logger.debug("[base request] Waited for %.2f seconds to respect rate limit", waited)
+            response = self.session.get(_url, headers=headers, params=data, stream=True)
             self.logger.debug(f"Request URL: {response.url}")
-            self.time_of_last_request = time.monotonic()
             response.raise_for_status()
             self.logger.debug(f"Response status: {response.status_code}")
             self.logger.debug(f"Response headers: {response.headers}")
-            self.logger.debug(f"Response content: {response.text[:500]}")
 
         except requests.HTTPError as exc:
+            exc.response.close()  # streamed, so hand the connection back to the pool
             code = exc.response.status_code
             if code in [429, 500, 502, 503, 504]:
                 self.logger.error(f"Request failed with status code {code}")
             raise
         else:
             if response.status_code == 200:
-                json = response.json()
-                if 'result' in json:
-                    json.pop('result')
-                    key = list(json.keys())[0]
-                    df = pd.json_normalize(json[key])
-                    # Normalize column name to 'Date' if 'date' exists
-                    if 'Date' in df.columns and 'date' not in df.columns:
-                        df.rename(columns={'Date': 'date'}, inplace=True)
-                    if 'date' in df.columns or 'Date' in df.columns:
-                        '''
-                        # df['date'] = pd.to_datetime(df['Date'])
-                        # df['date'] = df['date'].map(lambda x: TernaPandasClient._adjust_tz(x, tz="Europe/Rome"))
-                        
-                        df['date'] = pd.to_datetime(df['date']).dt.tz_localize('Europe/Rome', ambiguous='NaT')
-                        '''                        
-                        # df.sort_values(by='date', inplace=True)
-                        # df.set_index('date', inplace=True)
-                        pass
-                    elif 'Year' in df.columns:
-                        # df.set_index('Year', inplace=True)
-                        pass
-                    for col in df.columns:
-                        if col != 'date':  # <-- evita di convertire la colonna Date in numeric
-                          try:
-                              df[col] = pd.to_numeric(df[col])
-                          except (ValueError, TypeError):
-                              pass
-                    return df
-                else:
-                    return None
+                return _json_to_df(self._read_payload(response))
             else:
+                response.close()  # body is never read, hand the connection back to the pool
                 self.logger.error(f"Request failed with status code {response.status_code}")
                 return None
             
         
+    def _read_payload(self, response: requests.Response) -> Dict:
+        """
+        Decode a (streamed) response body. Large bodies are parsed
+        incrementally with ijson, if installed, so the raw bytes are never
+        held in memory alongside the decoded records.
+
+        The size is taken from Content-Length, i.e. the compressed size for
+        gzipped bodies; bodies without it (chunked) are always decoded in
+        one go with orjson.
+        """
+        size = int(response.headers.get('Content-Length', 0))
+        if ijson is None or size <= STREAM_THRESHOLD:
+            content = response.content
+            self.logger.debug("Response content: %s", content[:500])
+            return orjson.loads(content)
+
+        self.logger.debug("Streaming %d bytes response with ijson", size)
+        response.raw.decode_content = True  # let urllib3 handle gzip/deflate
+        try:
+            return dict(ijson.kvitems(response.raw, '', use_float=True))
+        finally:
+            response.close()
+
     def _fetch_with_optional_params(self, endpoint, start=None, end=None, **kwargs):
         extra = {k: v for k, v in kwargs.items() if v is not None}
 
@@ -217,9 +394,9 @@ class TernaPandasClient:
         ----------
         item : str
             API endpoint for the request.
-        start : pd.Timestamp, optional
+        start : pd.Timestamp or datetime.date, optional
             Start date (if applicable).
-        end : pd.Timestamp, optional
+        end : pd.Timestamp or datetime.date, optional
             End date (if applicable).
         extra_params : dict, optional
             Additional parameters for the API request.
@@ -228,14 +405,7 @@ class TernaPandasClient:
         -------
         pd.DataFrame
         """
-        data = {}
-
-        if start is not None and end is not None:
-            data['dateFrom'] = start.strftime('%d/%m/%Y')
-            data['dateTo'] = end.strftime('%d/%m/%Y')
-
-        if extra_params:
-            data.update(extra_params)
+        data = _request_data(start, end, extra_params)
 
         print(f"\n{item}")
         return self._base_request(item, data)
@@ -330,11 +500,179 @@ class TernaPandasClient:
     
     @staticmethod
     def _adjust_tz(dt, tz):
-        delta = dt.minute % 15
-        if delta == 0:
-            return dt.tz_localize(tz, ambiguous=True)
-        else:
-            return (dt - datetime.timedelta(minutes=delta+15*(4-delta))).tz_localize(tz, ambiguous=False)
+        if isinstance(dt, pd.Series):
+            return _adjust_tz(dt, tz)
+        return _adjust_tz(pd.Series([dt]), tz).iloc[0]
+
+    def __repr__(self):
+        return f"<TernaPandasClient(api_key={self.api_key[:4]}***, api_secret={self.api_secret[:4]}***)>"
+
+class _AsyncRateLimiter(_RateLimiter):
+    async def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            wait = self._take()
+            if not wait:
+                return waited
+            await asyncio.sleep(wait)
+            waited += wait
+
+class AsyncTernaPandasClient:
+    def __init__(
+            self, api_key: str, api_secret: str, session: Optional["aiohttp.ClientSession"] = None,
+            proxy: Optional[str] = None, timeout: Optional[int] = None,
+            log_level: Optional[int] = logging.ERROR):
+        """
+        Parameters
+        ----------
+        api_client : str
+        api_secret : str
+        session : aiohttp.ClientSession
+        proxy : str
+            aiohttp proxy url
+        timeout : int
+        log_level : int, optional
+            Logging level (default: logging.ERROR)
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncTernaPandasClient requires aiohttp: pip install terna-py[async]")
+        if api_key is None:
+            raise TypeError("API key cannot be None")
+        if api_secret is None:
+            raise TypeError("API secret cannot be None")
+
+        # own logger, so the level of existing TernaPandasClient instances is left alone
+        self.logger = _setup_logger(f"{__name__}.async", log_level)
+
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.session = session
+        self._owns_session = session is None
+        self.proxy = proxy
+        self.timeout = timeout
+        # only override aiohttp's default timeout when one is given
+        self._request_kwargs = {'proxy': proxy}
+        if timeout is not None:
+            self._request_kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+        self.token = None
+        self.token_expires_monotonic = time.monotonic()
+        self._limiter = _AsyncRateLimiter()
+        self._token_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def close(self):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        # the session has to be created inside the running event loop
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    async def _request_token(self) -> Optional[str]:
+        """
+        Returns
+        -------
+        access_token : str
+        """
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            # keep current token if still valid
+            if self.token and time.monotonic() < self.token_expires_monotonic - 5:
+                return self.token
+
+            data = {
+                'client_id': self.api_key,
+                'client_secret': self.api_secret,
+                'grant_type': 'client_credentials',
+            }
+            await self._limiter.acquire()
+            async with self._get_session().post(URL, data=data, **self._request_kwargs) as response:
+                if response.status in [429, 500, 502, 503, 504]:
+                    self.logger.error(response.status)
+                response.raise_for_status()
+                payload = orjson.loads(await response.read())
+
+            self.token = payload.get('access_token')
+            self.token_expires_monotonic = time.monotonic() + payload.get('expires_in')
+            return self.token
+
+    async def _base_request(self, item, data: Dict) -> pd.DataFrame:
+        """
+        Parameters
+        ----------
+        data : dict
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        access_token = await self._request_token()
+        headers = {
+            'accept': 'application/json',
+            'Authorization': f'Bearer {access_token}'
+        }
+        _url = f"{BASE_URL}{item}"
+        # aiohttp wants str values and repeated keys for list parameters; None is dropped like requests does
+        params = [(k, str(v)) for k, values in data.items()
+                  for v in (values if isinstance(values, (list, tuple)) else [values]) if v is not None]
+        self.logger.debug("API endpoint: " + _url)
+        self.logger.debug(f"Request data: {data}")
+
+        await self._limiter.acquire()
+        async with self._get_session().get(_url, headers=headers, params=params,
+                                           **self._request_kwargs) as response:
+            if response.status in [429, 500, 502, 503, 504]:
+                self.logger.error(f"Request failed with status code {response.status}")
+            response.raise_for_status()
+            content = await response.read()
+        return _json_to_df(orjson.loads(content))
+
+    async def fetch_data(self, item: str, start: pd.Timestamp = None, end: pd.Timestamp = None,
+                         extra_params: Optional[dict] = None) -> pd.DataFrame:
+        """
+        Async counterpart of TernaPandasClient.fetch_data.
+
+        Parameters
+        ----------
+        item : str
+            API endpoint for the request.
+        start : pd.Timestamp or datetime.date, optional
+            Start date (if applicable).
+        end : pd.Timestamp or datetime.date, optional
+            End date (if applicable).
+        extra_params : dict, optional
+            Additional parameters for the API request.
+
+        Returns
+        -------
+        pd.DataFrame
+        """
+        return await self._base_request(item, _request_data(start, end, extra_params))
+
+    async def fetch_many(self, items: List[Tuple]) -> List[pd.DataFrame]:
+        """
+        Fetch several endpoints concurrently, sharing the rate limit.
+
+        Parameters
+        ----------
+        items : list of tuple
+            Positional arguments of fetch_data, e.g. (item, start, end, extra_params).
+
+        Returns
+        -------
+        list of pd.DataFrame
+            In the same order as `items`.
+        """
+        return await asyncio.gather(*(self.fetch_data(*args) for args in items))
 
     def __repr__(self):
-        return f"<TernaPandasClient(api_key={self.api_key[:4]}***, api_secret={self.api_secret[:4]}***)>"
\ No newline at end of file
+        return f"<AsyncTernaPandasClient(api_key={self.api_key[:4]}***, api_secret={self.api_secret[:4]}***)>"
@@ -0,0 +1,120 @@
+import asyncio
+import io
+import logging
+import time
+
+import pytest
+
+aiohttp = pytest.importorskip("aiohttp")
+from aiohttp import web
+
+import terna.terna as trn_module
+from terna import AsyncTernaPandasClient, TernaPandasClient
+
+INTERVAL = 0.1  # seconds between requests during the tests
+
+
+def _make_app(state):
+    async def token(request):
+        state['token_calls'] += 1
+        state['times'].append(time.monotonic())
+        return web.json_response({'access_token': 'tok', 'expires_in': 3600})
+
+    async def data(request):
+        state['times'].append(time.monotonic())
+        assert request.headers['Authorization'] == 'Bearer tok'
+        name = request.match_info['name']
+        state['queries'][name] = list(request.query.items())
+        # answer the first requests last, so completion order differs from request order
+        await asyncio.sleep(state['delays'].get(name, 0))
+        if name in state['payloads']:
+            return web.json_response(state['payloads'][name])
+        return web.json_response({
+            'result': {'status': 'OK'},
+            'values': [{'date': '01/01/2024 00:00:00', 'value': '1.5', 'name': name}],
+        })
+
+    app = web.Application()
+    app.router.add_post('/token', token)
+    app.router.add_get('/data/{name}', data)
+    return app
+
+
+def _run(state, scenario, monkeypatch):
+    monkeypatch.setattr(trn_module._AsyncRateLimiter, 'RATE', 1 / INTERVAL)
+
+    async def main():
+        runner = web.AppRunner(_make_app(state))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = runner.addresses[0][1]
+        monkeypatch.setattr(trn_module, 'URL', f'http://127.0.0.1:{port}/token')
+        monkeypatch.setattr(trn_module, 'BASE_URL', f'http://127.0.0.1:{port}/')
+        try:
+            async with AsyncTernaPandasClient(api_key='key', api_secret='secret') as client:
+                return await scenario(client)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def state():
+    return {'token_calls': 0, 'times': [], 'queries': {}, 'delays': {}, 'payloads': {}}
+
+
+def test_fetch_many_keeps_order_and_reuses_token(state, monkeypatch):
+    names = ['a', 'b', 'c']
+    state['delays'] = {'a': 0.3, 'b': 0.15, 'c': 0}
+    dfs = _run(state, lambda client: client.fetch_many([(f'data/{n}',) for n in names]), monkeypatch)
+
+    assert [df['name'].iloc[0] for df in dfs] == names
+    assert state['token_calls'] == 1
+    assert dfs[0]['value'].dtype == 'float64'
+
+
+def test_requests_respect_rate_limit(state, monkeypatch):
+    _run(state, lambda client: client.fetch_many([('data/x',)] * 4), monkeypatch)
+
+    gaps = [b - a for a, b in zip(state['times'], state['times'][1:])]
+    assert len(gaps) == 4  # token + 4 data requests
+    assert min(gaps) >= INTERVAL * 0.9
+
+
+def test_fetch_data_params(state, monkeypatch):
+    import datetime
+
+    async def scenario(client):
+        return await client.fetch_data('data/p', datetime.date(2024, 1, 2), datetime.date(2024, 2, 3),
+                                       {'biddingZone': ['North', 'South'], 'type': None})
+
+    _run(state, scenario, monkeypatch)
+    assert state['queries']['p'] == [
+        ('dateFrom', '02/01/2024'), ('dateTo', '03/02/2024'),
+        ('biddingZone', 'North'), ('biddingZone', 'South'),
+    ]
+
+
+def test_async_client_leaves_sync_logger_level(monkeypatch):
+    TernaPandasClient(api_key='key', api_secret='secret', log_level=logging.WARNING)
+    AsyncTernaPandasClient(api_key='key', api_secret='secret', log_level=logging.DEBUG)
+    assert logging.getLogger(trn_module.__name__).level == logging.WARNING
+
+
+def test_async_client_log_level_is_honoured():
+    client = AsyncTernaPandasClient(api_key='key', api_secret='secret', log_level=logging.DEBUG)
+    stream = io.StringIO()
+    old = client.logger.handlers[0].setStream(stream)
+    try:
+        client.logger.debug("async debug message")
+    finally:
+        client.logger.handlers[0].setStream(old)
+    assert "async debug message" in stream.getvalue()
+
+
+
+def test_payload_without_data_key(state, monkeypatch):
+    state['payloads'] = {'empty': {'result': {'status': 'OK'}}}
+    assert _run(state, lambda client: client.fetch_data('data/empty'), monkeypatch) is None
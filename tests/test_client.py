@@ -0,0 +1,75 @@
+import io
+
+import orjson
+import pandas as pd
+import requests
+import pytest
+from urllib3.exceptions import ResponseError
+
+import terna.terna as trn_module
+
+
+def test_retry_backoff_respects_rate_limit():
+    retry = trn_module._RateLimitedRetry(total=3, backoff_factor=trn_module.RATE_LIMIT,
+                                         status_forcelist=(500,), raise_on_status=False)
+    backoffs = []
+    for _ in range(3):
+        retry = retry.increment(method='GET', url='/', error=ResponseError('500'))
+        backoffs.append(retry.get_backoff_time())
+    assert isinstance(retry, trn_module._RateLimitedRetry)
+    assert min(backoffs) >= trn_module.RATE_LIMIT
+
+
+def _records(n):
+    return [{'date': f'01/01/2024 {i % 24:02d}:00:00', 'value': str(i / 4), 'count': i,
+             'zone': 'North' if i % 2 else 'South', 'flag': None if i % 3 else 1.5}
+            for i in range(n)]
+
+
+@pytest.mark.parametrize('records', [
+    _records(trn_module.ARROW_THRESHOLD + 5),
+    [{'a': 1}] + [{'a': i, 'b': str(i)} for i in range(trn_module.ARROW_THRESHOLD + 5)],
+    [{'a': i, 'l': [i, i + 1]} for i in range(trn_module.ARROW_THRESHOLD + 5)],
+    [{'a': 2 ** 70}] + [{'a': i} for i in range(trn_module.ARROW_THRESHOLD + 5)],
+])
+def test_arrow_path_matches_dataframe_path(records, monkeypatch):
+    pytest.importorskip("pyarrow")
+    payload = {'result': {'status': 'OK'}, 'values': records}
+    with_arrow = trn_module._json_to_df(payload)
+    monkeypatch.setattr(trn_module, 'pa', None)
+    without_arrow = trn_module._json_to_df(payload)
+    pd.testing.assert_frame_equal(with_arrow, without_arrow)
+    assert with_arrow.map(type).equals(without_arrow.map(type))
+
+
+def _response(body, content_length):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Length'] = str(content_length)
+    response.raw = io.BytesIO(body)
+    return response
+
+
+def test_streamed_payload_matches_orjson_path():
+    pytest.importorskip("ijson")
+    payload = {'result': {'status': 'OK'}, 'values': _records(20000)}
+    body = orjson.dumps(payload)
+    assert len(body) > trn_module.STREAM_THRESHOLD
+
+    client = trn_module.TernaPandasClient(api_key='key', api_secret='secret')
+    streamed = _response(body, len(body))
+    df = trn_module._json_to_df(client._read_payload(streamed))
+
+    assert streamed.raw.closed
+    pd.testing.assert_frame_equal(df, trn_module._json_to_df(orjson.loads(body)))
+
+
+def test_non_200_response_is_closed(monkeypatch):
+    client = trn_module.TernaPandasClient(api_key='key', api_secret='secret')
+    client.token, client.token_expires_monotonic = 'tok', float('inf')
+    response = _response(b'', 0)
+    response.status_code = 204
+    monkeypatch.setattr(client.session, 'get', lambda *args, **kwargs: response)
+
+    assert client._base_request('data/x', {}) is None
+    assert response.raw.closed